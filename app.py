@@ -1,324 +1,426 @@
-"""
-FastAPI Application - Main entry point for the meta-learning AI system
-"""
-
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from datetime import datetime
-
-from utils.input_analyzer import InputAnalyzer
-from meta_controller.strategy_selector import StrategySelector
-from feedback.experience_store import ExperienceStore
-
-# Initialize FastAPI app
-app = FastAPI(
-    title="Meta-Learning AI System",
-    description="AI system that intelligently selects learning strategies",
-    version="1.0.0"
-)
-
-# Add CORS middleware for Next.js frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:3001"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize components
-analyzer = InputAnalyzer()
-experience_store = ExperienceStore()
-meta_controller = StrategySelector(experience_store=experience_store)
-
-
-# Request/Response Models
-class QueryRequest(BaseModel):
-    query: str
-    user_id: Optional[str] = None
-
-
-class AnalyzeResponse(BaseModel):
-    features: Dict[str, Any]
-    timestamp: str
-
-
-class DecideResponse(BaseModel):
-    selected_strategy: str
-    reason: str
-    features: Dict[str, Any]
-
-
-class ResponseModel(BaseModel):
-    query: str
-    answer: str
-    strategy: str
-    reason: str
-    confidence: float
-    experience_id: int
-    timestamp: str
-
-
-class FeedbackRequest(BaseModel):
-    experience_id: int
-    feedback: int  # 1 for helpful, 0 for not helpful
-
-
-class StatsResponse(BaseModel):
-    strategy_stats: Dict[str, Any]
-    total_queries: int
-    recent_experiences: list
-
-
-# API Endpoints
-
-@app.get("/")
-async def root():
-    """Root endpoint with API information"""
-    return {
-        "name": "Meta-Learning AI System",
-        "version": "1.0.0",
-        "description": "AI that chooses how to learn",
-        "endpoints": {
-            "analyze": "/analyze - Analyze query features",
-            "decide": "/decide - Select learning strategy",
-            "respond": "/respond - Generate complete response",
-            "feedback": "/feedback - Submit user feedback",
-            "stats": "/stats - Get system statistics"
-        }
-    }
-
-
-@app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_query(request: QueryRequest):
-    """
-    Analyze a query and extract features
-    
-    This endpoint demonstrates the input analysis step
-    """
-    try:
-        features = analyzer.analyze(request.query)
-        
-        return AnalyzeResponse(
-            features=features,
-            timestamp=datetime.now().isoformat()
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
-
-
-@app.post("/decide", response_model=DecideResponse)
-async def decide_strategy(request: QueryRequest):
-    """
-    Decide which learning strategy to use
-    
-    This endpoint demonstrates the META-LEARNING decision process
-    """
-    try:
-        # Analyze query
-        features = analyzer.analyze(request.query)
-        
-        # Select strategy (META-LEARNING HAPPENS HERE)
-        selected_strategy = meta_controller.select_strategy(features)
-        
-        return DecideResponse(
-            selected_strategy=selected_strategy,
-            reason=f"Selected based on query features and past performance",
-            features=features
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Strategy selection failed: {str(e)}")
-
-
-@app.post("/respond", response_model=ResponseModel)
-async def generate_response(request: QueryRequest):
-    """
-    Complete pipeline: Analyze → Decide → Execute → Store
-    
-    This is the main endpoint that demonstrates the full meta-learning system
-    """
-    try:
-        # Step 1: Analyze query features
-        features = analyzer.analyze(request.query)
-        print(f"[v0] Analyzed query: {features}")
-        
-        # Step 2: Select strategy (META-LEARNING)
-        selected_strategy = meta_controller.select_strategy(features)
-        print(f"[v0] Selected strategy: {selected_strategy}")
-        
-        # Step 3: Execute strategy
-        answer, confidence, reason, actual_strategy = meta_controller.execute_strategy(
-            selected_strategy,
-            request.query,
-            features
-        )
-        print(f"[v0] Generated response with confidence: {confidence}")
-        print(f"[v0] Actual strategy used: {actual_strategy}")
-        
-        # Step 4: Store experience (use actual strategy, not selected)
-        experience_id = experience_store.store_experience(
-            query=request.query,
-            strategy=actual_strategy,  # Use actual, not selected
-            confidence=confidence,
-            answer=answer,
-            reason=reason,
-            features=features,
-            feedback=None  # No feedback yet
-        )
-        print(f"[v0] Stored experience in Supabase with ID: {experience_id}")
-        
-        return ResponseModel(
-            query=request.query,
-            answer=answer,
-            strategy=actual_strategy,  # Return actual strategy used
-            reason=reason,
-            confidence=confidence,
-            experience_id=experience_id,
-            timestamp=datetime.now().isoformat()
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Response generation failed: {str(e)}")
-
-
-@app.post("/feedback")
-async def submit_feedback(request: FeedbackRequest):
-    """
-    Submit user feedback to improve the system
-    
-    This enables META-LEARNING by updating strategy weights
-    """
-    try:
-        # Update feedback in store
-        success = experience_store.update_feedback(
-            request.experience_id,
-            request.feedback
-        )
-        
-        if not success:
-            raise HTTPException(status_code=404, detail="Experience not found")
-        
-        # Update meta-controller weights (META-LEARNING UPDATE)
-        # Get the strategy used for this experience
-        recent = experience_store.get_recent_experiences(limit=100)
-        for exp in recent:
-            if exp['id'] == request.experience_id:
-                meta_controller.update_from_feedback(
-                    exp['strategy'],
-                    request.feedback == 1
-                )
-                break
-        
-        if request.feedback == 1:
-            try:
-                # Automatic Learning: Trigger simplified retraining on positive feedback
-                print("=" * 60)
-                print("[META-LEARNING] 🧠 POSITIVE FEEDBACK RECEIVED!")
-                print("[META-LEARNING] 🔄 Triggering automatic model retraining...")
-                print("=" * 60)
-                
-                if 'Classical ML' in meta_controller.strategies:
-                    ml_engine = meta_controller.strategies['Classical ML']
-                    # Use lighter dataset for auto-train to avoid lag
-                    recent_data = experience_store.get_recent_experiences(limit=50)
-                    print(f"[META-LEARNING] Fetched {len(recent_data)} recent experiences for training")
-                    
-                    ml_engine.retrain(recent_data)
-                    
-                    print("=" * 60)
-                    print("[META-LEARNING] ✅ Auto-learning complete!")
-                    print("=" * 60)
-            except Exception as e:
-                print(f"[META-LEARNING] ❌ Auto-learning failed (non-critical): {e}")
-
-        return {
-            "status": "success",
-            "message": "Feedback recorded, weights updated, and model retrained.",
-            "experience_id": request.experience_id
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Feedback submission failed: {str(e)}")
-
-
-@app.get("/stats", response_model=StatsResponse)
-async def get_statistics():
-    """
-    Get system statistics and performance metrics
-    
-    Shows how the system is learning over time
-    """
-    try:
-        # Get strategy statistics
-        strategy_stats = experience_store.get_strategy_stats()
-        
-        # Get recent experiences
-        recent = experience_store.get_recent_experiences(limit=10)
-        
-        # Calculate total queries
-        total_queries = sum(stats.get('total_uses', 0) for stats in strategy_stats.values())
-        
-        return StatsResponse(
-            strategy_stats=strategy_stats,
-            total_queries=total_queries,
-            recent_experiences=recent
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Stats retrieval failed: {str(e)}")
-
-
-@app.post("/retrain")
-async def retrain_model():
-    """
-    Trigger retraining of the ML Engine using feedback data from Supabase.
-    This fulfills the requirement: "Periodically retrain ML classifiers"
-    """
-    try:
-        print("[v0] Starting model retraining...")
-        # Fetch verified successful interactions for training
-        # In a real production system, this would use a dedicated method to fetch all labeled data
-        recent_data = experience_store.get_recent_experiences(limit=500)
-        
-        # Access the underlying MLEngine from StrategySelector
-        if 'Classical ML' in meta_controller.strategies:
-            ml_engine = meta_controller.strategies['Classical ML']
-            
-            # Use data from Supabase to retrain
-            # We filter for positive feedback inside retrain, or here. 
-            # MLEngine.retrain expects list of dicts.
-            if hasattr(ml_engine, 'retrain'):
-                ml_engine.retrain(recent_data)
-                return {"status": "success", "message": "ML Engine retraining completed successfully"}
-            else:
-                 return {"status": "error", "message": "MLEngine does not support retraining"}
-        
-        return {"status": "error", "message": "Classical ML strategy not found"}
-        
-    except Exception as e:
-        print(f"[v0] Retraining error: {e}")
-        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
-
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "components": {
-            "analyzer": "operational",
-            "meta_controller": "operational",
-            "experience_store": "operational"
-        }
-    }
-
-
-# Run with: uvicorn app:app --reload
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+"""
+FastAPI Application - Main entry point for the meta-learning AI system
+"""
+
+import logging
+import logging.handlers
+import queue
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime
+from uuid import uuid4
+
+from utils.input_analyzer import InputAnalyzer
+from meta_controller.strategy_selector import StrategySelector
+from feedback.experience_store import ExperienceStore
+
+# Buffered logging: records go onto an in-process queue and a QueueListener
+# thread drains them to stdout, so request coroutines never block on the
+# stdout lock. Per-query detail is logged at DEBUG so its formatting is
+# skipped entirely at the default INFO level.
+logger = logging.getLogger("metalearn")
+_log_queue: "queue.Queue" = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+
+# Shared components. Created once per worker inside the lifespan handler so
+# importing this module stays cheap (no Supabase TLS setup, no joblib load,
+# no transformer weights) and shutdown can close the async HTTP pool cleanly.
+analyzer: Optional[InputAnalyzer] = None
+experience_store: Optional[ExperienceStore] = None
+meta_controller: Optional[StrategySelector] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global analyzer, experience_store, meta_controller
+    analyzer = InputAnalyzer()
+    experience_store = ExperienceStore()
+    meta_controller = StrategySelector(experience_store=experience_store)
+    # Also exposed on app.state for anything that prefers explicit access
+    app.state.analyzer = analyzer
+    app.state.experience_store = experience_store
+    app.state.meta_controller = meta_controller
+    yield
+    await experience_store.aclose()
+
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="Meta-Learning AI System",
+    description="AI system that intelligently selects learning strategies",
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson does the JSON encoding in C (SIMD string escaping) — noticeably
+    # cheaper than stdlib json for the nested features/stats payloads
+    default_response_class=ORJSONResponse
+)
+
+# Add CORS middleware for Next.js frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000", "http://localhost:3001"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Request-level caches: real traffic repeats identical queries, so /analyze and
+# /decide results are memoized on the normalized query string instead of
+# re-running the analyzer / strategy scorer every time. The decide cache has a
+# short TTL so feedback-driven weight updates still propagate, and
+# submit_feedback clears it eagerly after updating weights.
+_ANALYZE_CACHE_SIZE = 4096
+_DECIDE_CACHE_SIZE = 2048
+_DECIDE_TTL_SECONDS = 60.0
+_analyze_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_decide_cache: "OrderedDict[str, Tuple[float, Dict[str, Any], str]]" = OrderedDict()
+
+
+def _cached_analyze(query: str) -> Dict[str, Any]:
+    """Bounded LRU around analyzer.analyze keyed on the normalized query."""
+    key = query.strip().lower()
+    features = _analyze_cache.get(key)
+    if features is not None:
+        _analyze_cache.move_to_end(key)
+        return features
+    features = analyzer.analyze(query)
+    _analyze_cache[key] = features
+    if len(_analyze_cache) > _ANALYZE_CACHE_SIZE:
+        _analyze_cache.popitem(last=False)
+    return features
+
+
+def _cached_decide(query: str) -> Tuple[Dict[str, Any], str]:
+    """TTL-bounded cache for the (features, strategy) decision pair."""
+    key = query.strip().lower()
+    now = time.monotonic()
+    entry = _decide_cache.get(key)
+    if entry is not None and entry[0] > now:
+        _decide_cache.move_to_end(key)
+        return entry[1], entry[2]
+    features = _cached_analyze(query)
+    strategy = meta_controller.select_strategy(features)
+    _decide_cache[key] = (now + _DECIDE_TTL_SECONDS, features, strategy)
+    if len(_decide_cache) > _DECIDE_CACHE_SIZE:
+        _decide_cache.popitem(last=False)
+    return features, strategy
+
+
+# Request/Response Models
+class QueryRequest(BaseModel):
+    query: str
+    user_id: Optional[str] = None
+
+
+class AnalyzeResponse(BaseModel):
+    features: Dict[str, Any]
+    timestamp: str
+
+
+class DecideResponse(BaseModel):
+    selected_strategy: str
+    reason: str
+    features: Dict[str, Any]
+
+
+class ResponseModel(BaseModel):
+    query: str
+    answer: str
+    strategy: str
+    reason: str
+    confidence: float
+    experience_id: int
+    timestamp: str
+
+
+class FeedbackRequest(BaseModel):
+    experience_id: int
+    feedback: int  # 1 for helpful, 0 for not helpful
+
+
+class StatsResponse(BaseModel):
+    strategy_stats: Dict[str, Any]
+    total_queries: int
+    recent_experiences: list
+
+
+# API Endpoints
+
+@app.get("/")
+async def root():
+    """Root endpoint with API information"""
+    return {
+        "name": "Meta-Learning AI System",
+        "version": "1.0.0",
+        "description": "AI that chooses how to learn",
+        "endpoints": {
+            "analyze": "/analyze - Analyze query features",
+            "decide": "/decide - Select learning strategy",
+            "respond": "/respond - Generate complete response",
+            "feedback": "/feedback - Submit user feedback",
+            "stats": "/stats - Get system statistics"
+        }
+    }
+
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_query(request: QueryRequest):
+    """
+    Analyze a query and extract features
+    
+    This endpoint demonstrates the input analysis step
+    """
+    try:
+        features = _cached_analyze(request.query)
+
+        return AnalyzeResponse(
+            features=features,
+            timestamp=datetime.now().isoformat()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@app.post("/decide", response_model=DecideResponse)
+async def decide_strategy(request: QueryRequest):
+    """
+    Decide which learning strategy to use
+    
+    This endpoint demonstrates the META-LEARNING decision process
+    """
+    try:
+        # Analyze + select strategy (META-LEARNING HAPPENS HERE), cached
+        features, selected_strategy = _cached_decide(request.query)
+
+        return DecideResponse(
+            selected_strategy=selected_strategy,
+            reason=f"Selected based on query features and past performance",
+            features=features
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Strategy selection failed: {str(e)}")
+
+
+@app.post("/respond", response_model=ResponseModel)
+async def generate_response(request: QueryRequest, background_tasks: BackgroundTasks):
+    """
+    Complete pipeline: Analyze → Decide → Execute → Store
+    
+    This is the main endpoint that demonstrates the full meta-learning system
+    """
+    try:
+        # Step 1: Analyze query features
+        features = analyzer.analyze(request.query)
+        logger.debug("[v0] Analyzed query: %s", features)
+        
+        # Step 2: Select strategy (META-LEARNING)
+        selected_strategy = meta_controller.select_strategy(features)
+        logger.debug("[v0] Selected strategy: %s", selected_strategy)
+        
+        # Step 3: Execute strategy
+        answer, confidence, reason, actual_strategy = meta_controller.execute_strategy(
+            selected_strategy,
+            request.query,
+            features
+        )
+        logger.debug("[v0] Generated response with confidence: %s", confidence)
+        logger.debug("[v0] Actual strategy used: %s", actual_strategy)
+        
+        # Step 4: Store experience (use actual strategy, not selected)
+        # The Supabase insert is a blocking network round-trip, so it runs as a
+        # background task AFTER the response is sent instead of stalling the
+        # event loop. We reserve the id client-side so the response doesn't
+        # wait for the DB. 53 random bits: the frontend round-trips this id
+        # through JSON as a JS number, so it must stay at or below
+        # Number.MAX_SAFE_INTEGER (2^53 - 1) or feedback targets a rounded,
+        # nonexistent row. Still fits the bigint identity column.
+        experience_id = uuid4().int >> 75
+        background_tasks.add_task(
+            experience_store.store_experience,
+            query=request.query,
+            strategy=actual_strategy,  # Use actual, not selected
+            confidence=confidence,
+            answer=answer,
+            reason=reason,
+            features=features,
+            feedback=None,  # No feedback yet
+            experience_id=experience_id
+        )
+        logger.debug("[v0] Queued experience write with reserved ID: %s", experience_id)
+        
+        return ResponseModel(
+            query=request.query,
+            answer=answer,
+            strategy=actual_strategy,  # Return actual strategy used
+            reason=reason,
+            confidence=confidence,
+            experience_id=experience_id,
+            timestamp=datetime.now().isoformat()
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Response generation failed: {str(e)}")
+
+
+@app.post("/feedback")
+async def submit_feedback(request: FeedbackRequest):
+    """
+    Submit user feedback to improve the system
+    
+    This enables META-LEARNING by updating strategy weights
+    """
+    try:
+        # Update feedback in store
+        success = await experience_store.update_feedback(
+            request.experience_id,
+            request.feedback
+        )
+        
+        if not success:
+            raise HTTPException(status_code=404, detail="Experience not found")
+        
+        # Update meta-controller weights (META-LEARNING UPDATE)
+        # Single indexed primary-key lookup for the strategy, instead of
+        # fetching and scanning the last 100 rows client-side
+        exp = await experience_store.get_experience(request.experience_id, columns="strategy,query")
+        if exp:
+            meta_controller.update_from_feedback(
+                exp['strategy'],
+                request.feedback == 1
+            )
+            # Weights changed, so cached strategy decisions are stale
+            _decide_cache.clear()
+
+        if request.feedback == 1:
+            try:
+                # Automatic Learning: Trigger simplified retraining on positive feedback
+                logger.info("[META-LEARNING] 🧠 Positive feedback received, triggering online update")
+
+                if exp and exp.get('query'):
+                    ml_engine = meta_controller.get_engine('Classical ML')
+                    # Online update: hash + partial_fit on just this one example
+                    # instead of re-fetching 50 rows and refitting a vocabulary
+                    label = ml_engine.derive_intent(exp['query'])
+                    if label:
+                        ml_engine.partial_train([exp['query']], [label])
+
+                    logger.info("[META-LEARNING] ✅ Auto-learning complete!")
+            except Exception as e:
+                logger.warning("[META-LEARNING] ❌ Auto-learning failed (non-critical): %s", e)
+
+        return {
+            "status": "success",
+            "message": "Feedback recorded, weights updated, and model retrained.",
+            "experience_id": request.experience_id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Feedback submission failed: {str(e)}")
+
+
+@app.get("/stats", response_model=StatsResponse)
+async def get_statistics():
+    """
+    Get system statistics and performance metrics
+    
+    Shows how the system is learning over time
+    """
+    try:
+        # Get strategy statistics
+        strategy_stats = await experience_store.get_strategy_stats()
+        
+        # Get recent experiences
+        recent = await experience_store.get_recent_experiences(limit=10)
+        
+        # Calculate total queries
+        total_queries = sum(stats.get('total_uses', 0) for stats in strategy_stats.values())
+        
+        return StatsResponse(
+            strategy_stats=strategy_stats,
+            total_queries=total_queries,
+            recent_experiences=recent
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Stats retrieval failed: {str(e)}")
+
+
+@app.post("/retrain")
+async def retrain_model():
+    """
+    Trigger retraining of the ML Engine using feedback data from Supabase.
+    This fulfills the requirement: "Periodically retrain ML classifiers"
+    """
+    try:
+        logger.info("[v0] Starting model retraining...")
+        # Fetch verified successful interactions for training. The feedback=1
+        # predicate runs in the database (index-backed), so only labeled
+        # positives are transferred — no client-side filtering needed.
+        recent_data = await experience_store.get_training_data(limit=500)
+        
+        # Access the underlying MLEngine from StrategySelector
+        ml_engine = meta_controller.get_engine('Classical ML')
+
+        # Use data from Supabase to retrain
+        # We filter for positive feedback inside retrain, or here.
+        # MLEngine.retrain expects list of dicts.
+        if hasattr(ml_engine, 'retrain'):
+            ml_engine.retrain(recent_data)
+            return {"status": "success", "message": "ML Engine retraining completed successfully"}
+        else:
+            return {"status": "error", "message": "MLEngine does not support retraining"}
+        
+    except Exception as e:
+        logger.error("[v0] Retraining error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "components": {
+            "analyzer": "operational",
+            "meta_controller": "operational",
+            "experience_store": "operational"
+        }
+    }
+
+
+# Run with: uvicorn app:app --reload
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # uvloop (libuv event loop) + httptools (C HTTP parser) roughly halve the
+    # framework overhead per request. uvloop isn't available on Windows, so
+    # fall back to the default selector loop there instead of failing.
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "auto"
+
+    # Multi-worker mode needs the import-string form, not the app object
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop=loop_impl,
+        http="httptools",
+        workers=os.cpu_count()
+    )
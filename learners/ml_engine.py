@@ -3,19 +3,26 @@ Classical ML Learning Strategy
 Uses scikit-learn for intent classification and simple predictions.
 """
 
+import math
 import os
 import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Tuple, List, Optional
 import joblib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.linear_model import SGDClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.exceptions import NotFittedError
 
 logger = logging.getLogger(__name__)
 
+# Process-wide model cache: repeated MLEngine constructions (per-worker
+# re-init, reloads) reuse the already-deserialized pipeline instead of
+# paying joblib.load from disk again.
+_MODEL_CACHE: Dict[str, Pipeline] = {}
+
 class MLEngine:
     def __init__(self, model_path: str = "data/ml_model.joblib"):
         self.model_path = model_path
@@ -28,17 +35,61 @@ class MLEngine:
             'example': ['example of', 'instance of', 'sample', 'show me'],
             'calculation': ['calculate', 'compute', 'solve', 'find value', 'sum of', 'avg', 'average', 'mean']
         }
+        # Fixed label set for partial_fit (online learning needs it up front)
+        self._all_classes = np.array(sorted(self.intent_patterns))
+        # Precompiled hot-path patterns: predict() runs these on every query,
+        # so build them once here instead of re-parsing literals per call.
+        self._arith_re = re.compile(r'\d+\s*[\+\-\*\/]\s*\d+')
+        self._num_re = re.compile(r'-?\d+\.?\d*')
+        self._calc_kw_re = re.compile(
+            r'calculate|solve|plus|minus|times|divided|avg|average|mean|sum'
+        )
+        self._avg_re = re.compile(r'avg|average|mean')
+        # Operator jump table: one compiled scan tokenizes every operator
+        # mention in the query, then dispatch is a dict lookup instead of a
+        # cascade of substring scans per op. Priority order matches the old
+        # cascade (avg > add > sub > mul > div).
+        self._op_re = re.compile(r'avg|average|mean|\+|add|sum|-|subtract|\*|multiply|/|divide')
+        self._op_canon = {
+            'avg': 'avg', 'average': 'avg', 'mean': 'avg',
+            '+': 'add', 'add': 'add', 'sum': 'add',
+            '-': 'sub', 'subtract': 'sub',
+            '*': 'mul', 'multiply': 'mul',
+            '/': 'div', 'divide': 'div',
+        }
+        self._op_table = {
+            'avg': self._op_avg, 'add': self._op_add, 'sub': self._op_sub,
+            'mul': self._op_mul, 'div': self._op_div,
+        }
+        self._op_priority = ('avg', 'add', 'sub', 'mul', 'div')
+        # One compiled alternation per intent: a single C-level scan replaces
+        # the Python loop over pattern substrings in _rule_based_fallback
+        self._intent_res = {
+            intent: re.compile('|'.join(map(re.escape, patterns)))
+            for intent, patterns in self.intent_patterns.items()
+        }
+        # Single writer thread: persisting the model is fire-and-forget, so
+        # training paths return after the fit instead of blocking on disk I/O
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         self._load_or_train_model()
 
     def _load_or_train_model(self):
+        cached = _MODEL_CACHE.get(self.model_path)
+        if cached is not None:
+            self.model = cached
+            return
         if os.path.exists(self.model_path):
             try:
-                self.model = joblib.load(self.model_path)
+                # mmap the numpy payloads (SGD coefficients) so they are
+                # paged in on demand and shared rather than copied per load
+                self.model = joblib.load(self.model_path, mmap_mode='r')
             except:
                 self._train_initial_model()
         else:
             self._train_initial_model()
+        if self.model is not None:
+            _MODEL_CACHE[self.model_path] = self.model
 
     def _train_initial_model(self):
         X, y = [], []
@@ -50,15 +101,78 @@ class MLEngine:
 
     def train(self, X: List[str], y: List[str]):
         try:
+            # HashingVectorizer is stateless (no vocabulary to fit), so the
+            # same pipeline supports true online updates via partial_train
             self.model = Pipeline([
-                ('tfidf', TfidfVectorizer(ngram_range=(1, 2), stop_words='english')),
+                ('hv', HashingVectorizer(n_features=2**18, ngram_range=(1, 2),
+                                         alternate_sign=False, stop_words='english')),
                 ('clf', SGDClassifier(loss='log_loss', alpha=1e-3, random_state=42)),
             ])
             self.model.fit(X, y)
-            joblib.dump(self.model, self.model_path)
+            self._io_pool.submit(self._persist, self.model)
+            _MODEL_CACHE[self.model_path] = self.model
         except Exception as e:
             logger.error(f"Training failed: {e}")
 
+    def _persist(self, model):
+        """Atomic write on the writer thread: dump to a temp file, then
+        os.replace over the target so a crash mid-write can never leave a
+        corrupt model on disk. Stored uncompressed: joblib cannot mmap a
+        compressed payload, and the mmap_mode='r' load path (demand paging,
+        shared coefficient arrays) is worth more than the smaller file."""
+        try:
+            tmp_path = self.model_path + '.tmp'
+            joblib.dump(model, tmp_path)
+            os.replace(tmp_path, self.model_path)
+        except Exception as e:
+            logger.error(f"Model persist failed: {e}")
+
+    def partial_train(self, X: List[str], y: List[str]):
+        """Online update: hash the new examples and partial_fit the classifier.
+        No vocabulary rebuild, no corpus refit — cost is O(len(X))."""
+        if not X:
+            return
+        try:
+            # Models persisted by the old TfidfVectorizer pipeline can't be
+            # updated incrementally; rebuild once on the hashing pipeline
+            if self.model is None or 'hv' not in getattr(self.model, 'named_steps', {}):
+                self._train_initial_model()
+            X_hashed = self.model.named_steps['hv'].transform(X)
+            clf = self.model.named_steps['clf']
+            # mmapped coefficient arrays are read-only; copy before the
+            # in-place partial_fit update
+            for attr in ('coef_', 'intercept_'):
+                arr = getattr(clf, attr, None)
+                if arr is not None and not arr.flags.writeable:
+                    setattr(clf, attr, np.array(arr))
+            clf.partial_fit(X_hashed, y, classes=self._all_classes)
+            self._io_pool.submit(self._persist, self.model)
+            _MODEL_CACHE[self.model_path] = self.model
+        except Exception as e:
+            logger.error(f"Partial training failed: {e}")
+
+    def derive_intent(self, query: str) -> Optional[str]:
+        """Weak label from the intent patterns, used to label feedback examples."""
+        q = query.lower()
+        for intent, pattern_re in self._intent_res.items():
+            if pattern_re.search(q):
+                return intent
+        return None
+
+    def retrain(self, experiences: List[Dict[str, Any]]):
+        """Batch refresh from stored experiences (positively-rated only).
+        With the hashing pipeline this is a pure partial_fit pass."""
+        X, y = [], []
+        for exp in experiences:
+            if exp.get('feedback') == 1 and exp.get('query'):
+                label = self.derive_intent(exp['query'])
+                if label:
+                    X.append(exp['query'])
+                    y.append(label)
+        if X:
+            self.partial_train(X, y)
+            logger.info(f"Retrained on {len(X)} positively-rated experiences")
+
     def predict(self, query: str, features: Dict[str, Any]) -> Tuple[str, float, str]:
         if not query: return "", 0.0, "Empty query"
         if self._is_calculation(query):
@@ -77,32 +191,56 @@ class MLEngine:
 
     def _is_calculation(self, query: str) -> bool:
         q = query.lower()
-        keywords = ['calculate', 'solve', 'plus', 'minus', 'times', 'divided', 'avg', 'average', 'mean', 'sum']
-        return any(k in q for k in keywords) or bool(re.search(r'\d+\s*[\+\-\*\/]\s*\d+', q))
+        return bool(self._calc_kw_re.search(q)) or bool(self._arith_re.search(q))
 
     def _handle_calculation(self, query: str) -> Tuple[str, float, str]:
         try:
-            numbers = [float(x) for x in re.findall(r'-?\d+\.?\d*', query)]
+            # Lazy parse: numbers are float-converted on demand. Binary ops
+            # (subtract/divide) pull just the first two off the generator;
+            # only the reductions materialize the full float64 array.
+            num_iter = (float(m.group()) for m in self._num_re.finditer(query))
             q = query.lower()
-            
-            if any(k in q for k in ['avg', 'average', 'mean']):
-                if not numbers: return "Please provide numbers for the average.", 0.5, "No numbers"
-                res = sum(numbers) / len(numbers)
-                return f"The average of {numbers} is {res:g}.", 0.95, "Mean calculated"
-
-            if len(numbers) < 2: return "Need at least 2 numbers for arithmetic.", 0.5, "Insufficient data"
-            
-            if '+' in q or 'add' in q or 'sum' in q: return f"Sum: {sum(numbers):g}", 0.95, "Addition"
-            if '-' in q or 'subtract' in q: return f"Difference: {numbers[0]-numbers[1]:g}", 0.95, "Subtraction"
-            if '*' in q or 'multiply' in q: return f"Product: {np.prod(numbers):g}", 0.95, "Multiplication"
-            if '/' in q or 'divide' in q:
-                if numbers[1] == 0: return "Zero division error.", 0.0, "Error"
-                return f"Quotient: {numbers[0]/numbers[1]:g}", 0.95, "Division"
-                
+
+            # One linear scan collects every operator token, then table-driven
+            # dispatch replaces the old substring-scan cascade
+            ops = {self._op_canon[tok] for tok in self._op_re.findall(q)}
+            for op in self._op_priority:
+                if op in ops:
+                    return self._op_table[op](num_iter)
+
         except Exception as e:
             logger.error(f"Calc error: {e}")
         return "Calculation not supported. I do basic math and averages.", 0.4, "Fallback"
 
+    def _op_avg(self, num_iter) -> Tuple[str, float, str]:
+        numbers = np.fromiter(num_iter, dtype=np.float64, count=-1)
+        if numbers.size == 0: return "Please provide numbers for the average.", 0.5, "No numbers"
+        res = (math.fsum(numbers) / numbers.size) if numbers.size < 8 else numbers.mean()
+        return f"The average of {numbers.tolist()} is {res:g}.", 0.95, "Mean calculated"
+
+    def _op_add(self, num_iter) -> Tuple[str, float, str]:
+        numbers = np.fromiter(num_iter, dtype=np.float64, count=-1)
+        if numbers.size < 2: return "Need at least 2 numbers for arithmetic.", 0.5, "Insufficient data"
+        total = math.fsum(numbers) if numbers.size < 8 else numbers.sum()
+        return f"Sum: {total:g}", 0.95, "Addition"
+
+    def _op_sub(self, num_iter) -> Tuple[str, float, str]:
+        a, b = next(num_iter, None), next(num_iter, None)
+        if b is None: return "Need at least 2 numbers for arithmetic.", 0.5, "Insufficient data"
+        return f"Difference: {a-b:g}", 0.95, "Subtraction"
+
+    def _op_mul(self, num_iter) -> Tuple[str, float, str]:
+        numbers = np.fromiter(num_iter, dtype=np.float64, count=-1)
+        if numbers.size < 2: return "Need at least 2 numbers for arithmetic.", 0.5, "Insufficient data"
+        prod = math.prod(numbers.tolist()) if numbers.size < 8 else numbers.prod()
+        return f"Product: {prod:g}", 0.95, "Multiplication"
+
+    def _op_div(self, num_iter) -> Tuple[str, float, str]:
+        a, b = next(num_iter, None), next(num_iter, None)
+        if b is None: return "Need at least 2 numbers for arithmetic.", 0.5, "Insufficient data"
+        if b == 0: return "Zero division error.", 0.0, "Error"
+        return f"Quotient: {a/b:g}", 0.95, "Division"
+
     def _generate_intent_response(self, intent: str) -> str:
         res = {
             'definition': "This is a definition query. Use Retrieval for details.",
@@ -116,7 +254,7 @@ class MLEngine:
 
     def _rule_based_fallback(self, query: str) -> Tuple[str, float, str]:
         q = query.lower()
-        for intent, patterns in self.intent_patterns.items():
-            if any(p in q for p in patterns):
+        for intent, pattern_re in self._intent_res.items():
+            if pattern_re.search(q):
                 return self._generate_intent_response(intent), 0.4, f"Pattern: {intent}"
         return "I'm not sure, but I'm learning!", 0.1, "Unknown"
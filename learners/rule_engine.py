@@ -13,14 +13,30 @@ class RuleEngine:
     def __init__(self):
         # Restricted patterns (Regex for flexibility)
         self.restricted_patterns = [
-            r"predict.*mark", 
+            r"predict.*mark",
             r"predict.*score",
             r"how.*hack",
             r"bypass.*security",
             r"cheat.*exam",
             r"illegal"
         ]
-        
+        # Union them into one compiled alternation: a single C-level scan per
+        # query instead of N separate re.search calls
+        self._restricted_re = re.compile(
+            "|".join(f"(?:{p})" for p in self.restricted_patterns)
+        )
+
+        self.indian_states = [
+            "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh",
+            "goa", "gujarat", "haryana", "himachal pradesh", "jharkhand", "karnataka",
+            "kerala", "madhya pradesh", "maharashtra", "manipur", "meghalaya", "mizoram",
+            "nagaland", "odisha", "punjab", "rajasthan", "sikkim", "tamil nadu", "telangana",
+            "tripura", "uttar pradesh", "uttarakhand", "west bengal"
+        ]
+        self._indian_states_re = re.compile(
+            r"\b(" + "|".join(map(re.escape, self.indian_states)) + r")\b"
+        )
+
         # FAQ / Static Knowledge Base
         self.static_rules = {
             "what is meta-learning": "Meta-learning is the process of 'learning how to learn', where an AI system automatically selects the best learning strategy for a given task.",
@@ -34,30 +50,47 @@ class RuleEngine:
             "what calculations": "I can help with basic addition, subtraction, multiplication, and division.",
             "how do you learn": "I learn by selecting the best strategy for your question and improving my strategy weights based on your 'Helpful' feedback."
         }
+        # Multi-pattern FAQ matcher: all keys compiled into one alternation so
+        # a single O(len(query)) scan replaces the per-key substring loop and
+        # keeps scaling flat as the FAQ grows. Longest keys first so the most
+        # specific match wins when keys overlap.
+        self._faq_re = re.compile(
+            "|".join(map(re.escape, sorted(self.static_rules, key=len, reverse=True)))
+        )
+
+    def may_apply(self, query: str) -> bool:
+        """Cheap pre-check: could any rule fire on this query?
+
+        Mirrors predict()'s match surface — restricted patterns, FAQ keys,
+        and the role-entity check — using the same precompiled scans, so
+        the meta-controller can decide whether the full rule probe is
+        worth an engine call without risking a missed safety block.
+        """
+        q = query.lower()
+        if self._restricted_re.search(q) or self._faq_re.search(q):
+            return True
+        if ("prime minister" in q or "pm of" in q or "president" in q):
+            return self._indian_states_re.search(q) is not None
+        return False
 
     def _is_invalid_role_query(self, query: str) -> Tuple[bool, str]:
         """Detect mismatch between political role and entity type (state vs country)"""
         query_lower = query.lower()
-        indian_states = [
-            "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", 
-            "goa", "gujarat", "haryana", "himachal pradesh", "jharkhand", "karnataka", 
-            "kerala", "madhya pradesh", "maharashtra", "manipur", "meghalaya", "mizoram", 
-            "nagaland", "odisha", "punjab", "rajasthan", "sikkim", "tamil nadu", "telangana", 
-            "tripura", "uttar pradesh", "uttarakhand", "west bengal"
-        ]
-        
+
         # Check for Prime Minister + State
         if "prime minister" in query_lower or "pm of" in query_lower:
-            for state in indian_states:
-                if state in query_lower:
-                    return True, f"In India, {state.title()} is a state and has a Chief Minister, not a Prime Minister. Are you looking for the Chief Minister of {state.title()}?"
-                    
+            match = self._indian_states_re.search(query_lower)
+            if match:
+                state = match.group(1)
+                return True, f"In India, {state.title()} is a state and has a Chief Minister, not a Prime Minister. Are you looking for the Chief Minister of {state.title()}?"
+
         # Check for President + State
         if "president" in query_lower:
-             for state in indian_states:
-                if state in query_lower:
-                    return True, f"Individual states in India do not have their own Presidents. They are headed by Governors. Were you looking for the Governor of {state.title()} or the President of India?"
-                    
+            match = self._indian_states_re.search(query_lower)
+            if match:
+                state = match.group(1)
+                return True, f"Individual states in India do not have their own Presidents. They are headed by Governors. Were you looking for the Governor of {state.title()} or the President of India?"
+
         return False, ""
 
     def predict(self, query: str, features: Dict[str, Any]) -> Tuple[str, float, str]:
@@ -71,23 +104,23 @@ class RuleEngine:
         if is_invalid:
             return correction, 1.0, "Role-Entity Mismatch Detected"
 
-        # 2. Check Restricted Queries (Safety Layer)
-        for pattern in self.restricted_patterns:
-            if re.search(pattern, query_lower):
-                return (
-                    "I cannot fulfill this request. My safety protocols prevent me from answering queries related to predictions of personal scores, hacking, or unethical activities.",
-                    1.0, 
-                    "Safety Rule Violation Blocked"
-                )
+        # 2. Check Restricted Queries (Safety Layer) - one precompiled scan
+        if self._restricted_re.search(query_lower):
+            return (
+                "I cannot fulfill this request. My safety protocols prevent me from answering queries related to predictions of personal scores, hacking, or unethical activities.",
+                1.0,
+                "Safety Rule Violation Blocked"
+            )
+
+        # 3. Check Static FAQs (single multi-pattern scan)
+        match = self._faq_re.search(query_lower)
+        if match:
+            key = match.group(0)
+            return (
+                self.static_rules[key],
+                1.0,
+                f"Static Rule Match: '{key}'"
+            )
 
-        # 3. Check Static FAQs (Exact or partial match)
-        for key, answer in self.static_rules.items():
-            if key in query_lower:
-                return (
-                    answer,
-                    1.0,
-                    f"Static Rule Match: '{key}'"
-                )
-        
         # 4. No rule matched
         return "", 0.0, "No rule matched"
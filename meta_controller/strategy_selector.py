@@ -3,133 +3,248 @@ Meta-Controller: Strategy Selection Engine
 This is the core META-LEARNING component that decides which learning strategy to use
 """
 
+import functools
 import logging
+import math
+import re
+import sys
+import numpy as np
 from typing import Dict, Any, Tuple
 from learners import RuleEngine, RetrievalEngine, MLEngine, TransformerEngine
 
 # Initialize logger for decision analysis
 logger = logging.getLogger(__name__)
 
+# Strategy-name constants, explicitly interned (multi-word strings aren't
+# auto-interned by CPython): the many dict probes on these keys across
+# selection, execution and stats short-circuit on pointer identity instead
+# of falling through to a full string compare.
+_RULE = sys.intern('Rule-Based')
+_RETRIEVAL = sys.intern('Retrieval')
+_ML = sys.intern('Classical ML')
+_TRANSFORMER = sys.intern('Transformer')
+
+
+class _LazyScores:
+    """Lazy repr for logger.debug: the round-and-format work only happens
+    if a handler actually renders the record."""
+    __slots__ = ('names', 'values')
+
+    def __init__(self, names, values):
+        self.names = names
+        self.values = values
+
+    def __str__(self):
+        return str({n: round(float(v), 2) for n, v in zip(self.names, self.values)})
+
+# Optional numba acceleration for the scoring kernel. When available the
+# fused utility computation runs as LLVM-compiled machine code; otherwise
+# the plain numpy expression below is used. cache=True persists the
+# compiled artifact so later processes skip recompilation.
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _score_kernel(base, weights, bonus):
+        return base * weights + bonus
+else:
+    def _score_kernel(base, weights, bonus):
+        return base * weights + bonus
+
 
 class StrategySelector:
     """
     Meta-Controller that selects the best learning strategy for each query.
     This implements META-LEARNING by learning which strategy works best over time.
     """
-    
+
+    # Factual-locking indicators compiled once at class load: one C-level
+    # scan per query instead of seven Python substring checks over a list
+    # rebuilt on every call.
+    _FACTUAL_RE = re.compile(
+        r'prime minister|chief minister|president|governor|limit|minimum|maximum'
+    )
+
+
     def __init__(self, experience_store=None):
-        # Initialize all learning strategies
-        self.strategies = {
-            'Rule-Based': RuleEngine(),
-            'Retrieval': RetrievalEngine(),
-            'Classical ML': MLEngine(),
-            'Transformer': TransformerEngine()
+        # Learning strategies are built on first use, not eagerly: sessions
+        # that never route a qualitative query never pay TransformerEngine's
+        # model download/load (hundreds of MB of weights) in startup time or
+        # memory. get_engine() materializes and caches each one on demand.
+        self._strategy_factories = {
+            _RULE: RuleEngine,
+            _RETRIEVAL: RetrievalEngine,
+            _ML: MLEngine,
+            _TRANSFORMER: TransformerEngine
         }
+        self._strategies = {}
         
-        # Strategy weights (meta-learning component)
-        # These weights are updated based on feedback
-        self.strategy_weights = {
-            'Rule-Based': 1.0,
-            'Retrieval': 1.0,
-            'Classical ML': 1.0,
-            'Transformer': 1.0
-        }
+        # Strategy weights (meta-learning component) are UCB1 scores derived
+        # from the success counters: mean_i + sqrt(2*ln(N)/n_i). The
+        # optimism term keeps rarely-tried strategies in play while the
+        # empirical mean dominates as evidence accumulates — a principled
+        # replacement for the old multiplicative update, with a better
+        # regret bound. The vector is refreshed from the counters whenever
+        # feedback lands (see _refresh_ucb); the strategy_weights property
+        # exposes the familiar dict view.
+        self._weights = np.full(4, 1.0, dtype=np.float32)
         
         # Success counters for each strategy
         self.strategy_success = {
-            'Rule-Based': {'success': 0, 'total': 0},
-            'Retrieval': {'success': 0, 'total': 0},
-            'Classical ML': {'success': 0, 'total': 0},
-            'Transformer': {'success': 0, 'total': 0}
+            _RULE: {'success': 0, 'total': 0},
+            _RETRIEVAL: {'success': 0, 'total': 0},
+            _ML: {'success': 0, 'total': 0},
+            _TRANSFORMER: {'success': 0, 'total': 0}
         }
         
         self.experience_store = experience_store
-        
+
         # Confidence threshold for fallback (lowered to reduce excessive Transformer fallbacks)
         self.confidence_threshold = 0.35
-    
-    def select_strategy(self, features: Dict[str, Any]) -> str:
-        """
-        Select the best learning strategy based on query features.
-        This is the META-LEARNING DECISION LOGIC.
-        
-        Args:
-            features: Query features from InputAnalyzer
-            
-        Returns:
-            Selected strategy name
+
+        # Fixed strategy column order for the vectorized scoring over _CAP
+        self._strategy_names = (_RULE, _RETRIEVAL, _ML, _TRANSFORMER)
+        self._strategy_idx = {n: i for i, n in enumerate(self._strategy_names)}
+        # Success rates maintained incrementally as feedback lands, so the
+        # /stats poll reads a snapshot instead of redoing the divisions.
+        # 0.5 is the default rate for untested strategies.
+        self._success_rates = np.full(4, 0.5, dtype=np.float32)
+        # Warm the jitted kernel here so first-call compilation latency
+        # lands at construction time, not on the first user request.
+        if _NUMBA_AVAILABLE:
+            _score_kernel(self._CAP[0].copy(), np.ones(4, dtype=np.float32),
+                          np.zeros(4, dtype=np.float32))
+
+        # Selection is deterministic given (intent, complexity, has_number)
+        # and the current weights, so repeated queries — common in
+        # interactive sessions — resolve from a hash table. The weights
+        # version is part of the key: bumping it in update_from_feedback
+        # invalidates every stale entry at once.
+        self._weights_version = 0
+        self._select_cached = functools.lru_cache(maxsize=1024)(self._score_and_pick)
+        self._refresh_ucb()
+
+    def _refresh_ucb(self):
+        """Recompute the UCB1 weight vector from the success counters.
+
+        Untried strategies get the prior mean of 0.5; ln(N) is clamped so
+        the cold-start case (no feedback at all) yields a flat vector.
         """
+        totals = np.array(
+            [self.strategy_success[n]['total'] for n in self._strategy_names], dtype=np.float64
+        )
+        successes = np.array(
+            [self.strategy_success[n]['success'] for n in self._strategy_names], dtype=np.float64
+        )
+        n = np.maximum(totals, 1.0)
+        mean = np.where(totals > 0, successes / n, 0.5)
+        explore = np.sqrt(2.0 * math.log(max(totals.sum(), 1.0)) / n)
+        # The 2x factor puts an untried arm (mean 0.5, no exploration term)
+        # at exactly 1.0 — the scale the capability matrix and heuristic
+        # bonuses were tuned against. Raw UCB scores around 0.5 let the
+        # flat bonuses dominate base*weight and invert cold-start routing
+        # (e.g. explanation/low would pick Retrieval over Transformer).
+        self._weights = ((mean + explore) * 2.0).astype(np.float32)
+    
     # Intent-Strategy capability matrix (Base Scores)
     # Higher = Better suited for the task based on architectural design
-    # Format: { intent: { strategy: base_score } }
-    CAPABILITY_MATRIX = {
-        'rule_violation': {'Rule-Based': 10.0, 'Retrieval': 0.0, 'Classical ML': 0.0, 'Transformer': 0.0},
-        'calculation':    {'Rule-Based': 1.0, 'Retrieval': 0.5, 'Classical ML': 8.0, 'Transformer': 2.0},
-        'factual':        {'Rule-Based': 2.0, 'Retrieval': 8.0, 'Classical ML': 2.0, 'Transformer': 3.0},
-        'explanation':    {'Rule-Based': 0.5, 'Retrieval': 4.0, 'Classical ML': 1.0, 'Transformer': 7.0},
-        'reason':         {'Rule-Based': 0.0, 'Retrieval': 3.0, 'Classical ML': 1.0, 'Transformer': 7.0},
-        'general':        {'Rule-Based': 1.0, 'Retrieval': 2.0, 'Classical ML': 3.0, 'Transformer': 6.0}
-    }
+    # Rows follow _INTENT_CODE; columns are Rule-Based, Retrieval,
+    # Classical ML, Transformer. One row slice per query replaces the old
+    # nested-dict lookups; the array is marked read-only so nothing can
+    # mutate the shared class-level table.
+    _INTENT_CODE = {'rule_violation': 0, 'calculation': 1, 'factual': 2,
+                    'explanation': 3, 'reason': 4, 'general': 5}
+    _CAP = np.array([
+        [10.0, 0.0, 0.0, 0.0],   # rule_violation
+        [1.0,  0.5, 8.0, 2.0],   # calculation
+        [2.0,  8.0, 2.0, 3.0],   # factual
+        [0.5,  4.0, 1.0, 7.0],   # explanation
+        [0.0,  3.0, 1.0, 7.0],   # reason
+        [1.0,  2.0, 3.0, 6.0],   # general
+    ], dtype=np.float32)
+    _CAP.setflags(write=False)
 
     def select_strategy(self, features: Dict[str, Any]) -> str:
         """
         Explainable Strategy Scoring Engine (Senior Architectural Edition)
         Enforces strict routing: Factual/Deterministic queries -> Retrieval ONLY.
         """
+        # Read every feature once up front: locals are LOAD_FAST in the
+        # bytecode, so the checks below skip repeated dict probes.
+        intent = features.get('intent', 'general')
+        complexity = features.get('complexity', 'low')
+        has_number = bool(features.get('has_number'))
+
         # RULE 0: Hard safety check
         if features.get('is_rule_violation'):
-            return 'Rule-Based'
+            return _RULE
 
-        intent = features.get('intent', 'general')
-        query_text = features.get('query', '').lower()
-        
         # --- SENIOR ARCHITECTURAL CONSTRAINT: Universal Factual Locking ---
         # "If the answer must be correct, it must be retrieved."
         # This covers political facts, rules, requirements, and general 'What is' questions.
-        factual_indicators = ['prime minister', 'chief minister', 'president', 'governor', 'limit', 'minimum', 'maximum']
-        if intent == 'factual' or any(kw in query_text for kw in factual_indicators):
+        # The intent check goes first so factual queries skip the .lower()
+        # copy and the scan entirely.
+        if intent == 'factual' or self._FACTUAL_RE.search(features.get('query', '').lower()):
             logger.info(f"[META-CONTROLLER] FACTUAL query detected. Enforcing deterministic Retrieval routing.")
-            return 'Retrieval'
+            return _RETRIEVAL
             
-        complexity = features.get('complexity', 'low')
-        scores = {}
-        intent_capabilities = self.CAPABILITY_MATRIX.get(intent, self.CAPABILITY_MATRIX['general'])
+        best_strategy, utilities = self._select_cached(
+            intent, complexity, has_number, self._weights_version
+        )
+        logger.debug("[META-CONTROLLER] Intent: %s | Scores: %s",
+                     intent, _LazyScores(self._strategy_names, utilities))
+        return best_strategy
 
-        for strategy_name in self.strategies.keys():
-            # 1. Base Score
-            base_score = intent_capabilities.get(strategy_name, 1.0)
-            
-            # --- TRANSFORMER GUARD ---
-            # Transformer allowed only for qualitative tasks (Requirement 2)
-            if strategy_name == 'Transformer' and intent not in ['explanation', 'reason', 'general']:
-                base_score = 0.1
+    def _score_and_pick(self, intent: str, complexity: str, has_number: bool,
+                        _version: int) -> Tuple[str, Tuple[float, ...]]:
+        """Scoring core behind the lru_cache; all arguments are hashable
+        scalars and _version pins the result to the weights that produced it."""
+        # 1. Base scores: one contiguous row slice per intent (copied — the
+        # class-level table is read-only and the guard below mutates)
+        base = self._CAP[self._INTENT_CODE.get(intent, 5)].copy()
 
-            # 2. Meta-Learning Weight
-            learned_weight = self.strategy_weights.get(strategy_name, 0.25) * 4.0
-            
-            # 3. Dynamic Heuristic Adjustment
-            context_bonus = 0.0
-            if complexity == 'high' and strategy_name == 'Transformer':
-                context_bonus = 3.0
-            elif complexity == 'low' and strategy_name in ['Rule-Based', 'Classical ML', 'Retrieval']:
-                context_bonus = 2.0
-                
-            if features.get('has_number') and strategy_name == 'Classical ML':
-                context_bonus += 2.0
-
-            final_utility = (base_score * learned_weight) + context_bonus
-            scores[strategy_name] = final_utility
-
-        best_strategy = max(scores, key=scores.get)
-        print(f"[META-CONTROLLER] Intent: {intent} | Scores: { {k: round(v, 2) for k, v in scores.items()} }")
-        return best_strategy
+        # --- TRANSFORMER GUARD ---
+        # Transformer allowed only for qualitative tasks (Requirement 2)
+        if intent not in ('explanation', 'reason', 'general'):
+            base[3] = 0.1
+
+        # 2. Meta-Learning Weights (UCB1 scores, fixed column order)
+        weights = self._weights
+
+        # 3. Dynamic Heuristic Adjustment
+        bonus = np.zeros(4, dtype=np.float32)
+        if complexity == 'high':
+            bonus[3] = 3.0   # Transformer
+        elif complexity == 'low':
+            bonus[:3] = 2.0  # Rule-Based, Retrieval, Classical ML
+        if has_number:
+            bonus[2] += 2.0  # Classical ML
+
+        utilities = _score_kernel(base, weights, bonus)
+        best_strategy = self._strategy_names[int(utilities.argmax())]
+        return best_strategy, tuple(float(u) for u in utilities)
     
+    def get_engine(self, name: str):
+        """Return the named engine, instantiating and caching it on first use."""
+        engine = self._strategies.get(name)
+        if engine is None:
+            logger.info(f"[META-CONTROLLER] Lazily initializing {name} engine")
+            engine = self._strategy_factories[name]()
+            self._strategies[name] = engine
+        return engine
+
+    @property
+    def strategy_weights(self) -> Dict[str, float]:
+        """Dict view of the weight vector for /stats and existing callers."""
+        return {n: float(w) for n, w in zip(self._strategy_names, self._weights)}
+
     def _get_success_rate(self, strategy: str) -> float:
-        """Calculate success rate for a strategy"""
-        stats = self.strategy_success[strategy]
-        if stats['total'] == 0:
-            return 0.5  # Default rate for untested strategies
-        return stats['success'] / stats['total']
+        """Success rate snapshot (kept current by update_from_feedback)"""
+        return float(self._success_rates[self._strategy_idx[strategy]])
     
     def _select_by_weights(self) -> str:
         """Select strategy based on learned weights"""
@@ -140,14 +255,24 @@ class StrategySelector:
         """
         Execute strategy with Confidence Guardrails (Requirement 5 & 6)
         """
-        # --- ZERO-LATENCY RULE GUARD ---
-        rule_answer, rule_conf, rule_reason = self.strategies['Rule-Based'].predict(query, features)
-        if rule_conf >= 0.9:
-            return rule_answer, rule_conf, rule_reason, 'Rule-Based'
-
         intent = features.get('intent', 'general')
+
+        # --- CONDITIONAL RULE GUARD ---
+        # The full rule probe runs whenever a rule could actually fire:
+        # flagged violations, explicit Rule-Based selections, or a hit on
+        # the engine's own cheap pre-scan (restricted patterns, FAQ keys,
+        # role-entity checks). Intent alone is not a reliable gate — most
+        # FAQ keys analyze as 'factual' or 'explanation', and restricted
+        # phrasings like "bypass security limits" hit the factual lock, so
+        # skipping the probe on those intents would bypass the safety layer.
+        rule_engine = self.get_engine(_RULE)
+        if (features.get('is_rule_violation') or strategy_name == _RULE
+                or rule_engine.may_apply(query)):
+            rule_answer, rule_conf, rule_reason = rule_engine.predict(query, features)
+            if rule_conf >= 0.9:
+                return rule_answer, rule_conf, rule_reason, _RULE
         original_strategy = strategy_name
-        strategy = self.strategies[strategy_name]
+        strategy = self.get_engine(strategy_name)
         answer, confidence, reason = strategy.predict(query, features)
         
         # --- SENIOR GUARD: Content Presence Check ---
@@ -162,15 +287,20 @@ class StrategySelector:
         # If the preferred strategy underperforms...
         if confidence < self.confidence_threshold:
             # FACTUAL POLICY: Factual queries must NEVER fallback to Transformer (Requirement 2)
-            if intent == 'factual' or strategy_name == 'Transformer':
+            if intent == 'factual' or strategy_name == _TRANSFORMER:
                 logger.warning(f"[META] Factual/Transformer confidence low ({confidence}). Refusing to guess.")
                 return "I don’t have verified information for this query. Please refine the question or provide a trusted source.", 0.0, "Safe Failure: Confidence below threshold", strategy_name
             
-            # QUALITATIVE FALLBACK: Allow Transformer for explanations/general queries
+            # QUALITATIVE FALLBACK: Allow Transformer for explanations/general queries.
+            # A non-empty low-confidence partial is passed along as context
+            # so the fallback builds on it instead of generating cold.
             logger.info(f"[FALLBACK] Escalating '{original_strategy}' to Transformer for qualitative reasoning.")
-            fallback_strategy = self.strategies['Transformer']
-            answer, confidence, reason = fallback_strategy.predict(query, features)
-            strategy_name = 'Transformer'
+            fallback_strategy = self.get_engine(_TRANSFORMER)
+            partial = answer.strip() if answer else None
+            answer, confidence, reason = fallback_strategy.predict(
+                query, features, context=partial or None
+            )
+            strategy_name = _TRANSFORMER
             
             # --- FINAL VALIDATION GUARD ---
             # If even the fallback fails validation (Requirement 3/5)
@@ -189,28 +319,28 @@ class StrategySelector:
             strategy: Strategy that was used
             success: Whether the response was helpful
         """
-        # Update success counters
-        self.strategy_success[strategy]['total'] += 1
-        if success:
-            self.strategy_success[strategy]['success'] += 1
-        
-        # Update weights (simple approach: increase for success, decrease for failure)
+        # Update success counters and the cached rate for this strategy
+        counters = self.strategy_success[strategy]
+        counters['total'] += 1
         if success:
-            self.strategy_weights[strategy] *= 1.1  # Increase by 10%
-        else:
-            self.strategy_weights[strategy] *= 0.9  # Decrease by 10%
+            counters['success'] += 1
+        self._success_rates[self._strategy_idx[strategy]] = (
+            counters['success'] / counters['total']
+        )
         
-        # Normalize weights
-        total_weight = sum(self.strategy_weights.values())
-        for key in self.strategy_weights:
-            self.strategy_weights[key] /= total_weight
-        
-        print(f"[v0] Updated weights after feedback: {self.strategy_weights}")
+        # The counters above are the whole learning state; refresh the UCB1
+        # vector from them and invalidate cached selections computed
+        # against the old scores. No normalization pass needed.
+        self._refresh_ucb()
+        self._weights_version += 1
+
+        logger.debug("[v0] Updated weights after feedback: %s",
+                     _LazyScores(self._strategy_names, self._weights))
     
     def get_strategy_stats(self) -> Dict[str, Any]:
         """Get statistics about strategy performance"""
         stats = {}
-        for strategy in self.strategies:
+        for strategy in self._strategy_factories:
             success_rate = self._get_success_rate(strategy)
             stats[strategy] = {
                 'weight': self.strategy_weights[strategy],
@@ -3,32 +3,85 @@ Real-time Model Monitoring Script
 Run this to see live updates when model retrains
 """
 
+import asyncio
 import os
-import time
+import threading
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+
+# Optional event-driven file watching: with watchdog installed the loop
+# wakes the instant the model file is rewritten (inotify on Linux, zero
+# syscalls while idle). Without it, the 5-second poll below still works.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    _WATCHDOG_AVAILABLE = True
+except ImportError:
+    _WATCHDOG_AVAILABLE = False
 
 MODEL_FILE = "data/ml_model.joblib"
 BACKEND_URL = "http://localhost:8000"
 
+_model_changed = threading.Event()
+
+if _WATCHDOG_AVAILABLE:
+    class _ModelFileHandler(FileSystemEventHandler):
+        def on_modified(self, event):
+            if event.src_path.endswith(os.path.basename(MODEL_FILE)):
+                _model_changed.set()
+
+        def on_moved(self, event):
+            # Retrains persist atomically: write ml_model.joblib.tmp, then
+            # os.replace() over the target. watchdog reports that as a move
+            # onto dest_path, not a modification of the model file itself.
+            if event.dest_path.endswith(os.path.basename(MODEL_FILE)):
+                _model_changed.set()
+
+def _start_observer():
+    """Start the watchdog observer if available; None means poll-only."""
+    if not _WATCHDOG_AVAILABLE:
+        return None
+    try:
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(_ModelFileHandler(), os.path.dirname(MODEL_FILE) or ".", recursive=False)
+        observer.start()
+        return observer
+    except Exception:
+        return None
+
+# One pooled connection reused across the 5-second polls: keep-alive
+# skips the TCP handshake on every iteration and keeps backend load flat.
+SESSION = requests.Session()
+SESSION.headers['Connection'] = 'keep-alive'
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
 def get_file_timestamp(filepath):
-    """Get last modified timestamp of file"""
-    if os.path.exists(filepath):
-        timestamp = os.path.getmtime(filepath)
-        return datetime.fromtimestamp(timestamp)
-    return None
+    """Get last modified timestamp of file (one stat syscall, no
+    exists-then-getmtime race)"""
+    try:
+        return datetime.fromtimestamp(os.stat(filepath).st_mtime)
+    except OSError:
+        return None
 
 def get_stats():
     """Fetch current stats from backend"""
     try:
-        response = requests.get(f"{BACKEND_URL}/stats", timeout=2)
+        response = SESSION.get(f"{BACKEND_URL}/stats", timeout=2)
         if response.status_code == 200:
             return response.json()
     except:
         return None
 
-def monitor():
-    """Monitor model file and stats in real-time"""
+async def monitor():
+    """Monitor model file and stats in real-time.
+
+    The file stat and the /stats HTTP call run concurrently via
+    asyncio.to_thread, so each cycle costs the slower of the two instead
+    of their sum. (Thread offload keeps requests and os.stat as-is — no
+    extra async HTTP/file dependencies needed for a monitoring script.)
+    """
     print("=" * 70)
     print("🔥 LIVE MODEL MONITORING")
     print("=" * 70)
@@ -42,7 +95,11 @@ def monitor():
     
     last_model_timestamp = get_file_timestamp(MODEL_FILE)
     last_total_queries = 0
-    
+
+    observer = _start_observer()
+    if observer:
+        print("👀 watchdog active: model changes wake the loop instantly")
+
     iteration = 0
     
     while True:
@@ -51,10 +108,14 @@ def monitor():
         
         # Header
         print(f"\n[{current_time}] === Refresh #{iteration} ===")
-        
-        # Check model file
-        current_model_timestamp = get_file_timestamp(MODEL_FILE)
-        
+
+        # Check model file and backend stats concurrently
+        current_model_timestamp, stats = await asyncio.gather(
+            asyncio.to_thread(get_file_timestamp, MODEL_FILE),
+            asyncio.to_thread(get_stats),
+        )
+
+
         if current_model_timestamp:
             if last_model_timestamp and current_model_timestamp > last_model_timestamp:
                 print(f"🔥 MODEL RETRAINED! (Updated at {current_model_timestamp.strftime('%H:%M:%S')})")
@@ -65,8 +126,7 @@ def monitor():
         else:
             print("❌ Model file not found")
         
-        # Check stats
-        stats = get_stats()
+        # Check stats (already fetched above)
         if stats:
             total = stats.get('total_queries', 0)
             
@@ -90,12 +150,15 @@ def monitor():
             print("❌ Cannot connect to backend at http://localhost:8000")
             print("   └─ Make sure: uvicorn app:app --reload is running")
         
-        # Wait before next check
+        # Wait before next check. With watchdog running, a model write
+        # trips the event and refreshes immediately; otherwise this is
+        # the plain 5-second cadence.
         print(f"\n⏳ Refreshing in 5 seconds... (Press Ctrl+C to stop)")
-        time.sleep(5)
+        await asyncio.to_thread(_model_changed.wait, 5)
+        _model_changed.clear()
 
 if __name__ == "__main__":
     try:
-        monitor()
+        asyncio.run(monitor())
     except KeyboardInterrupt:
         print("\n\n👋 Monitoring stopped.")
@@ -20,6 +20,32 @@ create table public.strategy_performance (
   last_updated timestamptz default now()
 );
 
+-- Composite index so the retraining query (WHERE feedback = 1 ORDER BY
+-- timestamp DESC LIMIT n) is served by an index-only scan.
+create index idx_exp_feedback_ts on public.experiences (feedback, timestamp desc);
+
+-- Atomic per-strategy stats bump, called by the backend via PostgREST RPC.
+-- One UPSERT replaces the old SELECT + UPDATE round-trip pair and is safe
+-- under concurrent requests (no read-modify-write race).
+create or replace function public.bump_strategy_stats(
+  p_strategy text,
+  p_confidence float,
+  p_feedback integer
+) returns void
+language sql as $$
+  insert into public.strategy_performance (strategy, total_uses, successful_uses, avg_confidence, last_updated)
+  values (p_strategy, 1, case when p_feedback = 1 then 1 else 0 end, p_confidence, now())
+  on conflict (strategy) do update set
+    total_uses = strategy_performance.total_uses + 1,
+    successful_uses = strategy_performance.successful_uses + case when p_feedback = 1 then 1 else 0 end,
+    -- Welford incremental mean: avg += (x - avg) / n. Numerically stable at
+    -- large counts (no large avg*total product) and one fewer multiply.
+    avg_confidence = strategy_performance.avg_confidence
+                     + (p_confidence - strategy_performance.avg_confidence)
+                       / (strategy_performance.total_uses + 1),
+    last_updated = now();
+$$;
+
 -- Enable Row Level Security (RLS)
 alter table public.experiences enable row level security;
 alter table public.strategy_performance enable row level security;